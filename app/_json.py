@@ -0,0 +1,19 @@
+from __future__ import annotations
+
+from typing import Any
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    import json
+
+    JSONDecodeError = json.JSONDecodeError
+
+    def loads(data: bytes | str) -> Any:
+        return json.loads(data)
+
+else:
+    JSONDecodeError = orjson.JSONDecodeError
+
+    def loads(data: bytes | str) -> Any:
+        return orjson.loads(data)
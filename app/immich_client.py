@@ -1,10 +1,40 @@
 from __future__ import annotations
 
-import asyncio
-from typing import Any, Iterable, Optional, Tuple
+import io
+import sys
+from typing import IO, Any, Iterable, Optional, Tuple
+from urllib.request import getproxies
 
 import httpx
 
+from ._json import loads
+
+
+DEFAULT_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=100)
+DEFAULT_TIMEOUT = httpx.Timeout(connect=5.0, read=30.0, write=30.0, pool=5.0)
+CONNECT_RETRIES = 2
+DOWNLOAD_CHUNK_SIZE = 1 << 20
+DOWNLOAD_PATHS = (
+    "/api/assets/{asset_id}/original",
+    "/api/assets/download/{asset_id}",
+    "/api/assets/{asset_id}/download",
+)
+UPLOAD_PATHS = ("/api/assets", "/api/assets/upload")
+
+
+def _environment_proxies() -> dict[str, str]:
+    # Same source httpx reads; "no" only lists NO_PROXY exclusions and configures no proxy itself
+    return {scheme: url for scheme, url in getproxies().items() if scheme != "no"}
+
+
+class AssetTooLargeError(Exception):
+    """Raised when a streamed download exceeds the caller's byte budget."""
+
+    def __init__(self, asset_id: str, size: int) -> None:
+        super().__init__(f"Asset {asset_id} exceeds the size limit ({size} bytes or more)")
+        self.asset_id = asset_id
+        self.size = size
+
 
 class ImmichClient:
     def __init__(self, base_url: str, api_key: str) -> None:
@@ -13,25 +43,33 @@ class ImmichClient:
             base = base[:-4]
         self.base_url = base
         self.api_key = api_key
-        self._client = httpx.Client(base_url=self.base_url, headers={"x-api-key": self.api_key})
+        # An explicit transport disables httpx's HTTP(S)_PROXY/NO_PROXY handling, so the
+        # connect-retry transport is only installed when the environment configures no proxy
+        transport = None
+        if not _environment_proxies():
+            transport = httpx.AsyncHTTPTransport(limits=DEFAULT_LIMITS, retries=CONNECT_RETRIES)
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={"x-api-key": self.api_key},
+            limits=DEFAULT_LIMITS,
+            timeout=DEFAULT_TIMEOUT,
+            transport=transport,
+        )
+        # Endpoint templates that answered on this server; probed once, then reused
+        self._download_path: str | None = None
+        self._upload_path: str | None = None
 
     async def aclose(self) -> None:
-        await asyncio.to_thread(self._client.close)
+        await self._client.aclose()
 
     async def get_album_info(self, album_id: str) -> dict[str, Any]:
-        return await asyncio.to_thread(self._get_album_info, album_id)
-
-    def _get_album_info(self, album_id: str) -> dict[str, Any]:
-        resp = self._client.get(f"/api/albums/{album_id}")
+        resp = await self._client.get(f"/api/albums/{album_id}")
         resp.raise_for_status()
-        return resp.json()
+        return loads(resp.content)
 
     async def list_albums(self) -> Tuple[bool, Optional[int]]:
-        return await asyncio.to_thread(self._list_albums)
-
-    def _list_albums(self) -> Tuple[bool, Optional[int]]:
         try:
-            resp = self._client.get("/api/albums")
+            resp = await self._client.get("/api/albums")
             return (resp.status_code == 200, resp.status_code)
         except httpx.HTTPStatusError as e:
             return (False, e.response.status_code if e.response else None)
@@ -40,11 +78,15 @@ class ImmichClient:
 
     @staticmethod
     def _normalize_assets_from_info(raw_assets: list[dict[str, Any]]) -> list[dict[str, Any]]:
-        normalized: list[dict[str, Any]] = []
-        for a in raw_assets:
-            normalized.append({
-                "id": a.get("id"),
-                "checksum": a.get("checksum") or (a.get("exifInfo", {}).get("hash") if isinstance(a.get("exifInfo"), dict) else None) or "",
+        return [
+            {
+                "id": asset_id,
+                # Interned so the same checksum seen on several servers shares one string object
+                "checksum": sys.intern(
+                    a.get("checksum")
+                    or (exif.get("hash") if isinstance(exif := a.get("exifInfo"), dict) else None)
+                    or ""
+                ),
                 "originalFileName": a.get("originalFileName"),
                 "fileCreatedAt": a.get("fileCreatedAt"),
                 "fileModifiedAt": a.get("fileModifiedAt"),
@@ -52,8 +94,10 @@ class ImmichClient:
                 "deviceId": a.get("deviceId"),
                 "size": a.get("fileSizeInByte") or a.get("size"),
                 "type": a.get("type"),
-            })
-        return [a for a in normalized if a.get("id")]
+            }
+            for a in raw_assets
+            if (asset_id := a.get("id"))
+        ]
 
     async def list_album_assets(self, album_id: str) -> list[dict[str, Any]]:
         info = await self.get_album_info(album_id)
@@ -61,33 +105,48 @@ class ImmichClient:
         return self._normalize_assets_from_info(raw)
 
     async def download_asset(self, asset_id: str) -> bytes:
-        return await asyncio.to_thread(self._download_asset, asset_id)
-
-    def _download_asset(self, asset_id: str) -> bytes:
-        resp = self._client.get(f"/api/assets/{asset_id}/original", follow_redirects=True)
-        if resp.status_code == 404:
-            resp = self._client.get(f"/api/assets/download/{asset_id}", follow_redirects=True)
-        if resp.status_code == 404:
-            resp = self._client.get(f"/api/assets/{asset_id}/download", follow_redirects=True)
-        resp.raise_for_status()
-        return resp.content
+        buffer = io.BytesIO()
+        await self.stream_asset(asset_id, buffer)
+        return buffer.getvalue()
+
+    async def stream_asset(self, asset_id: str, sink: IO[bytes], max_bytes: int | None = None) -> int:
+        """Write the original file of ``asset_id`` to ``sink`` chunk by chunk and return the byte count.
+
+        With ``max_bytes`` set, AssetTooLargeError is raised before any body is read when the server
+        announces a larger Content-Length, or as soon as the streamed body crosses the limit.
+        """
+
+        paths = (self._download_path,) if self._download_path else DOWNLOAD_PATHS
+        last_path = paths[-1]
+        for path in paths:
+            url = path.format(asset_id=asset_id)
+            async with self._client.stream("GET", url, follow_redirects=True) as resp:
+                if resp.status_code == 404 and path != last_path:
+                    continue
+                resp.raise_for_status()
+                self._download_path = path
+                if max_bytes is not None:
+                    announced = resp.headers.get("content-length")
+                    if announced and announced.isdigit() and int(announced) > max_bytes:
+                        raise AssetTooLargeError(asset_id, int(announced))
+                written = 0
+                async for chunk in resp.aiter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    written += len(chunk)
+                    if max_bytes is not None and written > max_bytes:
+                        raise AssetTooLargeError(asset_id, written)
+                    sink.write(chunk)
+                return written
+        raise RuntimeError("Asset download failed for all known endpoints")  # pragma: no cover - loop always returns
 
     async def upload_asset(
         self,
         filename: str,
-        content: bytes,
+        content: bytes | IO[bytes],
         metadata: dict[str, str],
         checksum_b64: str | None = None,
     ) -> dict[str, Any]:
-        return await asyncio.to_thread(self._upload_asset, filename, content, metadata, checksum_b64)
+        """Upload an asset; ``content`` may be a seekable binary file, which httpx streams in chunks."""
 
-    def _upload_asset(
-        self,
-        filename: str,
-        content: bytes,
-        metadata: dict[str, str],
-        checksum_b64: str | None = None,
-    ) -> dict[str, Any]:
         files = {
             "assetData": (filename, content),
             "deviceAssetId": (None, metadata.get("deviceAssetId", filename)),
@@ -95,40 +154,38 @@ class ImmichClient:
             "fileCreatedAt": (None, metadata.get("fileCreatedAt", "")),
             "fileModifiedAt": (None, metadata.get("fileModifiedAt", metadata.get("fileCreatedAt", ""))),
         }
-        headers = {"x-api-key": self.api_key}
-        if checksum_b64:
-            headers["x-immich-checksum"] = checksum_b64
-        resp = self._client.post("/api/assets", files=files, headers=headers)
-        if resp.status_code == 404:
-            resp = self._client.post("/api/assets/upload", files=files, headers=headers)
+        # x-api-key is already a default header on the client
+        headers = {"x-immich-checksum": checksum_b64} if checksum_b64 else None
+        paths = (self._upload_path,) if self._upload_path else UPLOAD_PATHS
+        for path in paths:
+            if not isinstance(content, bytes):
+                content.seek(0)
+            resp = await self._client.post(path, files=files, headers=headers)
+            if resp.status_code != 404:
+                break
         resp.raise_for_status()
-        return resp.json()
+        self._upload_path = path
+        return loads(resp.content)
 
     async def add_assets_to_album(self, album_id: str, asset_ids: Iterable[str]) -> list[dict[str, Any]]:
-        return await asyncio.to_thread(self._add_assets_to_album, album_id, asset_ids)
-
-    def _add_assets_to_album(self, album_id: str, asset_ids: Iterable[str]) -> list[dict[str, Any]]:
         ids = list(asset_ids)
-        resp = self._client.put(f"/api/albums/{album_id}/assets", json={"ids": ids})
+        resp = await self._client.put(f"/api/albums/{album_id}/assets", json={"ids": ids})
         if resp.status_code in (404, 405):
-            resp = self._client.post(f"/api/albums/{album_id}/assets", json={"ids": ids})
+            resp = await self._client.post(f"/api/albums/{album_id}/assets", json={"ids": ids})
         resp.raise_for_status()
         try:
-            return resp.json()
+            return loads(resp.content)
         except Exception:
             return []
 
     async def check_bulk_upload(self, assets: list[dict[str, str]]) -> dict[str, Any]:
-        return await asyncio.to_thread(self._check_bulk_upload, assets)
-
-    def _check_bulk_upload(self, assets: list[dict[str, str]]) -> dict[str, Any]:
         endpoints = ("/api/assets/check", "/api/asset/check")
         last_response: httpx.Response | None = None
         last_exception: httpx.HTTPError | None = None
 
         for endpoint in endpoints:
             try:
-                resp = self._client.post(endpoint, json={"assets": assets})
+                resp = await self._client.post(endpoint, json={"assets": assets})
             except httpx.HTTPError as exc:
                 last_exception = exc
                 continue
@@ -138,11 +195,11 @@ class ImmichClient:
                 continue
 
             resp.raise_for_status()
-            return resp.json()
+            return loads(resp.content)
 
         if last_response is not None:
             last_response.raise_for_status()
         if last_exception is not None:
             raise last_exception
 
-        raise RuntimeError("Bulk upload check failed for all known endpoints")
\ No newline at end of file
+        raise RuntimeError("Bulk upload check failed for all known endpoints")
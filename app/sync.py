@@ -1,15 +1,19 @@
 from __future__ import annotations
 
 import asyncio
-import json
+import contextlib
+import io
 import logging
+import tempfile
 from dataclasses import dataclass, field
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Tuple
+from types import MappingProxyType
+from typing import IO, Any, Dict, Iterable, List, Mapping, Tuple
 
 from tqdm import tqdm
 
-from .immich_client import ImmichClient
+from ._json import JSONDecodeError, loads
+from .immich_client import AssetTooLargeError, ImmichClient
 
 
 logger = logging.getLogger(__name__)
@@ -17,6 +21,17 @@ logger = logging.getLogger(__name__)
 
 Asset = Dict[str, Any]
 
+EXISTING_CHECK_BATCH_SIZE = 1000
+PROGRESS_REFRESH_SECONDS = 0.1
+SPOOL_TO_DISK_THRESHOLD = 32 << 20
+
+_REQUIRED_SERVER_FIELDS = ("name", "base_url", "api_key", "album_id")
+# Bulk-check actions meaning the target already holds the asset
+_EXISTING_ACTIONS = frozenset({"reject", "duplicate"})
+
+# Shared read-only default for index lookups so misses don't allocate a fresh dict
+_NO_ASSETS: Mapping[str, Asset] = MappingProxyType({})
+
 
 @dataclass(frozen=True)
 class ServerConfig:
@@ -78,18 +93,48 @@ class SyncSummary:
         return "\n".join(lines)
 
 
+@dataclass
+class SyncState:
+    index: dict[str, dict[str, Asset]]
+    checksumless_counts: dict[str, int]
+    missing: dict[str, list[str]]
+    all_checksums: tuple[str, ...]
+
+
 class OversizeError(Exception):
     """Raised when an asset is larger than the target's size budget."""
 
 
+class _BatchedProgress:
+    """Collects task completions and pushes them to a tqdm bar every ``interval`` seconds."""
+
+    def __init__(self, bar: tqdm, interval: float = PROGRESS_REFRESH_SECONDS) -> None:
+        self._bar = bar
+        self._interval = interval
+        self._pending = 0
+
+    def advance(self) -> None:
+        self._pending += 1
+
+    def flush(self) -> None:
+        if self._pending:
+            self._bar.update(self._pending)
+            self._pending = 0
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self._interval)
+            self.flush()
+
+
 def load_config(path: Path) -> SyncConfig:
     """Load a SyncConfig from a JSON file."""
 
     try:
-        raw = json.loads(path.read_text(encoding="utf-8"))
+        raw = loads(path.read_bytes())
     except FileNotFoundError as exc:  # pragma: no cover - explicit message preferred
         raise ValueError(f"Config file '{path}' does not exist") from exc
-    except json.JSONDecodeError as exc:
+    except JSONDecodeError as exc:
         raise ValueError(f"Config file '{path}' is not valid JSON: {exc}") from exc
 
     servers_data = raw.get("servers") if isinstance(raw, dict) else None
@@ -101,7 +146,7 @@ def load_config(path: Path) -> SyncConfig:
     for idx, entry in enumerate(servers_data):
         if not isinstance(entry, dict):
             raise ValueError(f"servers[{idx}] must be an object")
-        missing = [field for field in ("name", "base_url", "api_key", "album_id") if field not in entry]
+        missing = [field for field in _REQUIRED_SERVER_FIELDS if field not in entry]
         if missing:
             raise ValueError(f"servers[{idx}] is missing fields: {', '.join(missing)}")
 
@@ -147,6 +192,12 @@ def load_config(path: Path) -> SyncConfig:
 def index_assets(assets_by_server: Dict[str, List[Asset]]) -> Tuple[Dict[str, Dict[str, Asset]], Dict[str, int]]:
     """Create a checksum->asset index per server and count checksumless assets."""
 
+    return _index_assets(assets_by_server, None)
+
+
+def _index_assets(
+    assets_by_server: Dict[str, List[Asset]], all_checksums: set[str] | None
+) -> Tuple[Dict[str, Dict[str, Asset]], Dict[str, int]]:
     index: dict[str, dict[str, Asset]] = {}
     checksumless_counts: dict[str, int] = {}
     for name, assets in assets_by_server.items():
@@ -159,6 +210,8 @@ def index_assets(assets_by_server: Dict[str, List[Asset]]) -> Tuple[Dict[str, Di
                 continue
             # Preserve the first seen asset with this checksum
             per_checksum.setdefault(checksum, asset)
+        if all_checksums is not None:
+            all_checksums.update(per_checksum)
         index[name] = per_checksum
         checksumless_counts[name] = missing_checksum
     return index, checksumless_counts
@@ -169,13 +222,24 @@ def compute_missing(index: Dict[str, Dict[str, Asset]]) -> Dict[str, List[str]]:
 
     if not index:
         return {}
+    return _missing_from(index, set().union(*index.values()))
+
+
+def build_sync_state(assets_by_server: Dict[str, List[Asset]]) -> SyncState:
+    """Index every server's assets, collecting the checksum union during the walk, then derive the missing lists."""
+
     all_checksums: set[str] = set()
-    for per_server in index.values():
-        all_checksums.update(per_server.keys())
-    missing: dict[str, list[str]] = {}
-    for name, per_server in index.items():
-        missing[name] = [checksum for checksum in all_checksums if checksum not in per_server]
-    return missing
+    index, checksumless_counts = _index_assets(assets_by_server, all_checksums)
+    return SyncState(
+        index=index,
+        checksumless_counts=checksumless_counts,
+        missing=_missing_from(index, all_checksums),
+        all_checksums=tuple(sorted(all_checksums)),
+    )
+
+
+def _missing_from(index: Dict[str, Dict[str, Asset]], all_checksums: set[str]) -> Dict[str, List[str]]:
+    return {name: list(all_checksums - per_server.keys()) for name, per_server in index.items()}
 
 
 async def sync_assets(
@@ -187,36 +251,61 @@ async def sync_assets(
 ) -> SyncSummary:
     """Synchronise assets between all servers defined in the config."""
 
-    clients: dict[str, ImmichClient] = {
-        server.name: ImmichClient(server.base_url, server.api_key)
-        for server in config.servers
-    }
+    # Servers that differ only by album share one client and its connection pool
+    shared_clients: dict[tuple[str, str], ImmichClient] = {}
+    clients: dict[str, ImmichClient] = {}
+    for server in config.servers:
+        key = _server_key(server)
+        if key not in shared_clients:
+            shared_clients[key] = ImmichClient(server.base_url, server.api_key)
+        clients[server.name] = shared_clients[key]
 
     try:
-        assets: dict[str, list[Asset]] = {}
+        # Entries pointing at the same album on the same server share a single listing request
+        fetch_keys: dict[tuple[str, str, str], ServerConfig] = {}
         for server in config.servers:
+            key = (server.base_url, server.api_key, server.album_id)
+            if key in fetch_keys:
+                continue
+            fetch_keys[key] = server
             logger.info("Fetching assets from %s (%s)", server.name, server.base_url)
-            assets[server.name] = await clients[server.name].list_album_assets(server.album_id)
-
-        index, checksumless_counts = index_assets(assets)
-        missing = compute_missing(index)
-        all_checksums: list[str] = sorted({checksum for per_server in index.values() for checksum in per_server})
+        # Let every listing settle before raising so none is still in flight when the clients close
+        fetched = await asyncio.gather(
+            *(clients[server.name].list_album_assets(server.album_id) for server in fetch_keys.values()),
+            return_exceptions=True,
+        )
+        for result in fetched:
+            if isinstance(result, BaseException):
+                raise result
+        listings = dict(zip(fetch_keys, fetched))
+        assets: dict[str, list[Asset]] = {
+            server.name: listings[(server.base_url, server.api_key, server.album_id)] for server in config.servers
+        }
+
+        state = build_sync_state(assets)
+        index = state.index
+        missing = state.missing
+        all_checksums = state.all_checksums
 
         summary = SyncSummary(
             total_checksums=len(all_checksums),
-            checksumless_assets=checksumless_counts,
+            checksumless_assets=state.checksumless_counts,
         )
 
         for server in config.servers:
             per_server_missing = missing.get(server.name, [])
             summary.per_server[server.name] = ServerStats(
-                initial_assets=len(index.get(server.name, {})),
+                initial_assets=len(index.get(server.name, _NO_ASSETS)),
                 missing_before=len(per_server_missing),
                 remaining=len(per_server_missing),
             )
 
+        # Checksums already on every server need no work; only walk the ones missing somewhere
+        pending = set().union(*missing.values())
         tasks: list[tuple[str, ServerConfig, Asset, ServerConfig]] = []
         for checksum in all_checksums:
+            if checksum not in pending:
+                continue
             source_config, source_asset = _select_source(config.servers, index, checksum)
             if source_config is None or source_asset is None:
                 summary.errors.append(f"No source available for checksum {checksum}")
@@ -225,13 +314,23 @@ async def sync_assets(
             for target in config.servers:
                 if target.name == source_config.name:
                     continue
-                if checksum in index.get(target.name, {}):
+                if checksum in index.get(target.name, _NO_ASSETS):
                     continue
                 tasks.append((checksum, source_config, source_asset, target))
 
+        # Keyed by server rather than target: sibling albums on one server see each other's uploads
+        existing_by_server: dict[tuple[str, str], dict[str, str] | None] = {}
+        if not dry_run and tasks:
+            existing_by_server = await _prefetch_existing_assets(clients, tasks)
+        copy_locks: dict[tuple[str, str, str], asyncio.Lock] = {}
+
         progress_bar = None
+        ticker: _BatchedProgress | None = None
+        ticker_task: asyncio.Task[None] | None = None
         if progress and tasks:
             progress_bar = tqdm(total=len(tasks), desc="Syncing assets", unit="asset")
+            ticker = _BatchedProgress(progress_bar)
+            ticker_task = asyncio.create_task(ticker.run())
 
         semaphore = asyncio.Semaphore(max(1, int(workers)))
 
@@ -245,14 +344,18 @@ async def sync_assets(
                         _register_completion(summary, target.name, checksum, index, source_asset)
                         return
 
+                    # Serialise copies of one checksum to one server so sibling targets link, not re-upload
+                    copy_lock = copy_locks.setdefault((*_server_key(target), checksum), asyncio.Lock())
                     try:
-                        already_present = await _ensure_asset_on_target(
-                            checksum,
-                            source_config,
-                            source_asset,
-                            target,
-                            clients,
-                        )
+                        async with copy_lock:
+                            already_present = await _ensure_asset_on_target(
+                                checksum,
+                                source_config,
+                                source_asset,
+                                target,
+                                clients,
+                                existing_by_server.get(_server_key(target)),
+                            )
                     except OversizeError:
                         summary.per_server[target.name].oversized += 1
                         entry = {
@@ -283,18 +386,28 @@ async def sync_assets(
 
                     _register_completion(summary, target.name, checksum, index, source_asset)
             finally:
-                if progress_bar:
-                    progress_bar.update(1)
+                if ticker:
+                    ticker.advance()
 
         try:
             await asyncio.gather(*(process_task(*task) for task in tasks))
         finally:
+            if ticker_task:
+                ticker_task.cancel()
+                with contextlib.suppress(asyncio.CancelledError):
+                    await ticker_task
+            if ticker:
+                ticker.flush()
             if progress_bar:
                 progress_bar.close()
 
         return summary
     finally:
-        await asyncio.gather(*(client.aclose() for client in clients.values()))
+        await asyncio.gather(*(client.aclose() for client in shared_clients.values()))
+
+
+def _server_key(server: ServerConfig) -> tuple[str, str]:
+    return (server.base_url, server.api_key)
 
 
 def _select_source(
@@ -303,7 +416,7 @@ def _select_source(
     checksum: str,
 ) -> tuple[ServerConfig | None, Asset | None]:
     for server in servers:
-        asset = index.get(server.name, {}).get(checksum)
+        asset = index.get(server.name, _NO_ASSETS).get(checksum)
         if asset:
             return server, asset
     return None, None
@@ -329,6 +442,7 @@ async def _ensure_asset_on_target(
     source_asset: Asset,
     target: ServerConfig,
     clients: Dict[str, ImmichClient],
+    existing_ids: Dict[str, str] | None = None,
 ) -> bool:
     target_client = clients[target.name]
 
@@ -338,18 +452,16 @@ async def _ensure_asset_on_target(
     if size_limit is not None and isinstance(size, int) and size > size_limit:
         raise OversizeError()
 
-    # Prefer re-linking existing assets
-    existing_id = await _find_existing_asset(target_client, checksum)
+    # Prefer re-linking existing assets; fall back to a single lookup if the bulk check failed
+    if existing_ids is None:
+        existing_id = await _find_existing_asset(target_client, checksum)
+    else:
+        existing_id = existing_ids.get(checksum)
     if existing_id:
         await target_client.add_assets_to_album(target.album_id, [existing_id])
         return True
 
     source_client = clients[source.name]
-    content = await source_client.download_asset(source_asset["id"])
-
-    if size_limit is not None and (not isinstance(size, int)) and len(content) > size_limit:
-        raise OversizeError()
-
     filename = source_asset.get("originalFileName") or f"asset_{checksum}"
     metadata = {
         "deviceAssetId": source_asset.get("deviceAssetId") or f"{source.name}-{checksum}",
@@ -357,32 +469,115 @@ async def _ensure_asset_on_target(
         "fileCreatedAt": source_asset.get("fileCreatedAt") or "",
         "fileModifiedAt": source_asset.get("fileModifiedAt") or source_asset.get("fileCreatedAt") or "",
     }
-    upload_response = await target_client.upload_asset(filename, content, metadata, checksum_b64=checksum)
+
+    # Small originals stay in memory; large or unsized ones are spooled to disk
+    with _open_spool(size) as spool:
+        # Size unknown up front: let the download stop as soon as it is known to cross the budget
+        max_bytes = size_limit if not isinstance(size, int) else None
+        try:
+            await source_client.stream_asset(source_asset["id"], spool, max_bytes=max_bytes)
+        except AssetTooLargeError as exc:
+            raise OversizeError() from exc
+
+        upload_response = await target_client.upload_asset(filename, spool, metadata, checksum_b64=checksum)
     new_id = upload_response.get("id") or upload_response.get("assetId")
     if not new_id:
         raise RuntimeError("Target API did not return an asset id after upload")
+    if existing_ids is not None:
+        existing_ids[checksum] = str(new_id)
 
     await target_client.add_assets_to_album(target.album_id, [new_id])
     return False
 
 
+def _open_spool(size: Any) -> IO[bytes]:
+    # Decided up front rather than with SpooledTemporaryFile: httpx probes the upload's fileno(),
+    # which would force a spooled file to roll over to disk anyway
+    if isinstance(size, int) and size <= SPOOL_TO_DISK_THRESHOLD:
+        return io.BytesIO()
+    return tempfile.TemporaryFile()
+
+
 async def _find_existing_asset(client: ImmichClient, checksum: str) -> str | None:
     try:
         check = await client.check_bulk_upload([{"id": "sync", "checksum": checksum}])
     except Exception:
         return None
 
-    candidates = check.get("results") or check.get("assets") or []
-    if not isinstance(candidates, list):
-        return None
-
-    for entry in candidates:
-        if not isinstance(entry, dict):
-            continue
-        action = entry.get("action") or entry.get("status")
-        if action not in {"reject", "duplicate"}:
+    for entry in _check_entries(check):
+        if not _is_existing(entry):
             continue
-        existing_id = entry.get("assetId") or entry.get("existingId") or entry.get("id")
+        existing_id = _existing_id(entry) or entry.get("id")
         if existing_id:
             return str(existing_id)
     return None
+
+
+async def _prefetch_existing_assets(
+    clients: Dict[str, ImmichClient],
+    tasks: Iterable[tuple[str, ServerConfig, Asset, ServerConfig]],
+) -> dict[tuple[str, str], dict[str, str] | None]:
+    """Look up every pending checksum on each target server with bulk checks instead of one request per asset."""
+
+    checksums_by_server: dict[tuple[str, str], dict[str, None]] = {}
+    client_by_server: dict[tuple[str, str], ImmichClient] = {}
+    for checksum, _source, _asset, target in tasks:
+        key = _server_key(target)
+        checksums_by_server.setdefault(key, {})[checksum] = None
+        client_by_server.setdefault(key, clients[target.name])
+
+    keys = list(checksums_by_server)
+    found = await asyncio.gather(
+        *(_find_existing_assets(client_by_server[key], list(checksums_by_server[key])) for key in keys)
+    )
+    return dict(zip(keys, found))
+
+
+async def _find_existing_assets(client: ImmichClient, checksums: List[str]) -> dict[str, str] | None:
+    """Map checksum -> existing asset id on the target; ``None`` if the bulk check is unavailable."""
+
+    existing: dict[str, str] = {}
+    for start in range(0, len(checksums), EXISTING_CHECK_BATCH_SIZE):
+        batch = checksums[start : start + EXISTING_CHECK_BATCH_SIZE]
+        try:
+            check = await client.check_bulk_upload([{"id": checksum, "checksum": checksum} for checksum in batch])
+        except Exception:
+            return None
+        if not isinstance(check, dict):
+            return None
+
+        entries = _check_entries(check)
+        requested = set(batch)
+        # Results echo the request id; fall back to position for servers that omit it
+        positional = len(entries) == len(batch)
+        for position, entry in enumerate(entries):
+            if not _is_existing(entry):
+                continue
+            request_id = entry.get("id")
+            if request_id in requested:
+                checksum = request_id
+            elif positional:
+                checksum = batch[position]
+            else:
+                continue
+            existing_id = _existing_id(entry)
+            if existing_id:
+                existing[checksum] = existing_id
+    return existing
+
+
+def _check_entries(check: dict[str, Any]) -> list[dict[str, Any]]:
+    candidates = check.get("results") or check.get("assets") or []
+    if not isinstance(candidates, list):
+        return []
+    return [entry for entry in candidates if isinstance(entry, dict)]
+
+
+def _is_existing(entry: dict[str, Any]) -> bool:
+    action = entry.get("action") or entry.get("status")
+    return action in _EXISTING_ACTIONS
+
+
+def _existing_id(entry: dict[str, Any]) -> str | None:
+    existing_id = entry.get("assetId") or entry.get("existingId")
+    return str(existing_id) if existing_id else None
@@ -1,9 +1,15 @@
 from __future__ import annotations
 
+import io
+import json
+import tempfile
+from typing import AsyncIterator
+
 import httpx
 import pytest
 
-from app.immich_client import ImmichClient
+import app.immich_client as immich_client_mod
+from app.immich_client import CONNECT_RETRIES, AssetTooLargeError, ImmichClient
 
 
 class StubResponse:
@@ -16,8 +22,9 @@ class StubResponse:
         if self.status_code >= 400:
             raise httpx.HTTPStatusError("error", request=self.request, response=self)
 
-    def json(self) -> dict:
-        return self._payload
+    @property
+    def content(self) -> bytes:
+        return json.dumps(self._payload).encode()
 
 
 class FallbackStubClient:
@@ -25,7 +32,7 @@ class FallbackStubClient:
         self.base_url = base_url
         self.calls: list[str] = []
 
-    def post(self, endpoint: str, json: dict) -> StubResponse:
+    async def post(self, endpoint: str, json: dict) -> StubResponse:
         self.calls.append(endpoint)
         if len(self.calls) == 1:
             return StubResponse(404, f"{self.base_url}{endpoint}")
@@ -37,28 +44,178 @@ class Always404StubClient:
         self.base_url = base_url
         self.calls: list[str] = []
 
-    def post(self, endpoint: str, json: dict) -> StubResponse:
+    async def post(self, endpoint: str, json: dict) -> StubResponse:
         self.calls.append(endpoint)
         return StubResponse(404, f"{self.base_url}{endpoint}")
 
 
-def test_check_bulk_upload_falls_back_to_singular_endpoint() -> None:
+@pytest.mark.asyncio
+async def test_check_bulk_upload_falls_back_to_singular_endpoint() -> None:
     client = ImmichClient("https://example.com", "key")
     stub = FallbackStubClient(client.base_url)
     client._client = stub  # type: ignore[assignment]
 
-    result = client._check_bulk_upload([{"checksum": "abc"}])
+    result = await client.check_bulk_upload([{"checksum": "abc"}])
 
     assert result == {"results": ["ok"]}
     assert stub.calls == ["/api/assets/check", "/api/asset/check"]
 
 
-def test_check_bulk_upload_raises_when_all_endpoints_fail() -> None:
+@pytest.mark.asyncio
+async def test_check_bulk_upload_raises_when_all_endpoints_fail() -> None:
     client = ImmichClient("https://example.com", "key")
     stub = Always404StubClient(client.base_url)
     client._client = stub  # type: ignore[assignment]
 
     with pytest.raises(httpx.HTTPStatusError):
-        client._check_bulk_upload([{"checksum": "abc"}])
+        await client.check_bulk_upload([{"checksum": "abc"}])
 
     assert stub.calls == ["/api/assets/check", "/api/asset/check"]
+
+
+@pytest.mark.asyncio
+async def test_stream_asset_falls_back_to_legacy_download_path() -> None:
+    calls: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        if request.url.path == "/api/assets/download/abc":
+            return httpx.Response(200, content=b"payload")
+        return httpx.Response(404)
+
+    client = ImmichClient("https://example.com", "key")
+    client._client = httpx.AsyncClient(base_url=client.base_url, transport=httpx.MockTransport(handler))
+
+    sink = io.BytesIO()
+    written = await client.stream_asset("abc", sink)
+    await client.aclose()
+
+    assert written == len(b"payload")
+    assert sink.getvalue() == b"payload"
+    assert calls == ["/api/assets/abc/original", "/api/assets/download/abc"]
+
+
+@pytest.mark.asyncio
+async def test_stream_asset_reuses_resolved_download_path() -> None:
+    calls: list[str] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request.url.path)
+        if request.url.path.endswith("/download"):
+            return httpx.Response(200, content=b"x")
+        return httpx.Response(404)
+
+    client = ImmichClient("https://example.com", "key")
+    client._client = httpx.AsyncClient(base_url=client.base_url, transport=httpx.MockTransport(handler))
+
+    await client.stream_asset("one", io.BytesIO())
+    await client.stream_asset("two", io.BytesIO())
+    await client.aclose()
+
+    assert calls == [
+        "/api/assets/one/original",
+        "/api/assets/download/one",
+        "/api/assets/one/download",
+        "/api/assets/two/download",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_upload_asset_rewinds_file_for_legacy_endpoint() -> None:
+    bodies: dict[str, bytes] = {}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        bodies[request.url.path] = await request.aread()
+        if request.url.path == "/api/assets":
+            return httpx.Response(404)
+        return httpx.Response(201, json={"id": "new-id"})
+
+    client = ImmichClient("https://example.com", "key")
+    client._client = httpx.AsyncClient(base_url=client.base_url, transport=httpx.MockTransport(handler))
+
+    with tempfile.TemporaryFile() as spool:
+        spool.write(b"original-bytes")
+        result = await client.upload_asset("photo.jpg", spool, {"fileCreatedAt": "2024-01-01T00:00:00Z"})
+    await client.aclose()
+
+    assert result == {"id": "new-id"}
+    assert b"original-bytes" in bodies["/api/assets"]
+    assert b"original-bytes" in bodies["/api/assets/upload"]
+
+
+@pytest.mark.asyncio
+async def test_stream_asset_rejects_announced_length_over_budget() -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=b"x" * 100)
+
+    client = ImmichClient("https://example.com", "key")
+    client._client = httpx.AsyncClient(base_url=client.base_url, transport=httpx.MockTransport(handler))
+
+    sink = io.BytesIO()
+    with pytest.raises(AssetTooLargeError) as exc:
+        await client.stream_asset("abc", sink, max_bytes=10)
+    await client.aclose()
+
+    assert exc.value.size == 100
+    assert sink.getvalue() == b""
+
+
+@pytest.mark.asyncio
+async def test_stream_asset_stops_unannounced_body_over_budget() -> None:
+    async def body() -> AsyncIterator[bytes]:
+        for _ in range(5):
+            yield b"x" * 8
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=body())
+
+    client = ImmichClient("https://example.com", "key")
+    client._client = httpx.AsyncClient(base_url=client.base_url, transport=httpx.MockTransport(handler))
+
+    sink = io.BytesIO()
+    with pytest.raises(AssetTooLargeError):
+        await client.stream_asset("abc", sink, max_bytes=20)
+    await client.aclose()
+
+    assert len(sink.getvalue()) <= 20
+
+
+class RecordingTransport(httpx.AsyncHTTPTransport):
+    built: list[dict] = []
+
+    def __init__(self, **kwargs) -> None:
+        type(self).built.append(kwargs)
+        super().__init__(**kwargs)
+
+
+@pytest.mark.asyncio
+async def test_client_keeps_environment_proxy_support(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(immich_client_mod, "_environment_proxies", lambda: {"https": "http://proxy.internal:3128"})
+    monkeypatch.setattr(RecordingTransport, "built", [])
+    monkeypatch.setattr(immich_client_mod.httpx, "AsyncHTTPTransport", RecordingTransport)
+
+    client = ImmichClient("https://example.com", "key")
+    await client.aclose()
+
+    assert RecordingTransport.built == []
+
+
+@pytest.mark.asyncio
+async def test_client_uses_retry_transport_without_proxy(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(immich_client_mod, "_environment_proxies", lambda: {})
+    monkeypatch.setattr(RecordingTransport, "built", [])
+    monkeypatch.setattr(immich_client_mod.httpx, "AsyncHTTPTransport", RecordingTransport)
+
+    client = ImmichClient("https://example.com", "key")
+    await client.aclose()
+
+    assert len(RecordingTransport.built) == 1
+    assert RecordingTransport.built[0]["retries"] == CONNECT_RETRIES
+
+
+def test_environment_proxies_ignore_no_proxy_exclusions(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(
+        immich_client_mod, "getproxies", lambda: {"no": "localhost", "https": "http://proxy.internal:3128"}
+    )
+
+    assert immich_client_mod._environment_proxies() == {"https": "http://proxy.internal:3128"}
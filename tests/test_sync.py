@@ -1,12 +1,17 @@
 from __future__ import annotations
 
+import asyncio
+import contextlib
+import io
 import json
 from pathlib import Path
+from typing import IO
 
 import pytest
 
 import app.sync as sync_mod
-from app.sync import ServerConfig, SyncConfig, compute_missing, index_assets, load_config
+from app.immich_client import AssetTooLargeError
+from app.sync import ServerConfig, SyncConfig, build_sync_state, compute_missing, index_assets, load_config
 
 
 def write_config(tmp_path: Path, data: dict) -> Path:
@@ -53,6 +58,14 @@ def test_load_config_rejects_invalid(tmp_path: Path, payload: dict, message: str
     assert message in str(exc.value)
 
 
+def test_load_config_rejects_malformed_json(tmp_path: Path) -> None:
+    cfg_path = tmp_path / "config.json"
+    cfg_path.write_text("{not json", encoding="utf-8")
+    with pytest.raises(ValueError) as exc:
+        load_config(cfg_path)
+    assert "not valid JSON" in str(exc.value)
+
+
 def test_index_assets_and_missing() -> None:
     assets = {
         "one": [
@@ -70,6 +83,30 @@ def test_index_assets_and_missing() -> None:
     assert set(missing["two"]) == {"chk1"}
 
 
+def test_build_sync_state_matches_separate_passes() -> None:
+    assets = {
+        "one": [
+            {"id": "1", "checksum": "chk1"},
+            {"id": "2", "checksum": ""},
+        ],
+        "two": [
+            {"id": "3", "checksum": "chk2"},
+            {"id": "4", "checksum": "chk1"},
+        ],
+    }
+    state = build_sync_state(assets)
+    index, checksumless_counts = index_assets(assets)
+    assert state.index == index
+    assert state.checksumless_counts == checksumless_counts
+    assert {name: sorted(missing) for name, missing in state.missing.items()} == {
+        name: sorted(missing) for name, missing in compute_missing(index).items()
+    }
+    assert state.all_checksums == ("chk1", "chk2")
+    assert state.checksumless_counts == {"one": 1, "two": 0}
+    assert state.missing == {"one": ["chk2"], "two": []}
+    assert set(state.index["two"]) == {"chk1", "chk2"}
+
+
 @pytest.mark.asyncio
 async def test_sync_assets_copies_missing(monkeypatch: pytest.MonkeyPatch) -> None:
     assets_by_base = {
@@ -97,10 +134,13 @@ async def test_sync_assets_copies_missing(monkeypatch: pytest.MonkeyPatch) -> No
         async def list_album_assets(self, album_id: str) -> list[dict]:
             return list(assets_by_base[self.base_url])
 
-        async def download_asset(self, asset_id: str) -> bytes:
-            return b"binary-data"
+        async def stream_asset(self, asset_id: str, sink: IO[bytes], max_bytes: int | None = None) -> int:
+            sink.write(b"binary-data")
+            return len(b"binary-data")
 
-        async def upload_asset(self, filename: str, content: bytes, metadata: dict, checksum_b64: str | None = None) -> dict:
+        async def upload_asset(
+            self, filename: str, content: IO[bytes], metadata: dict, checksum_b64: str | None = None
+        ) -> dict:
             uploads.append((self.base_url, filename))
             return {"id": f"{self.base_url}-uploaded"}
 
@@ -159,10 +199,12 @@ async def test_sync_assets_links_existing(monkeypatch: pytest.MonkeyPatch) -> No
         async def list_album_assets(self, album_id: str) -> list[dict]:
             return list(assets_by_base[self.base_url])
 
-        async def download_asset(self, asset_id: str) -> bytes:
+        async def stream_asset(self, asset_id: str, sink: IO[bytes], max_bytes: int | None = None) -> int:
             raise AssertionError("download should not be called when asset already exists")
 
-        async def upload_asset(self, filename: str, content: bytes, metadata: dict, checksum_b64: str | None = None) -> dict:
+        async def upload_asset(
+            self, filename: str, content: IO[bytes], metadata: dict, checksum_b64: str | None = None
+        ) -> dict:
             uploads.append((self.base_url, filename))
             return {"id": f"{self.base_url}-uploaded"}
 
@@ -199,4 +241,347 @@ async def test_sync_assets_links_existing(monkeypatch: pytest.MonkeyPatch) -> No
     assert summary.copied == 0
     assert summary.linked == 1
     assert uploads == []
-    assert album_updates == [("https://secondary", ("existing-secondary-id",))]
\ No newline at end of file
+    assert album_updates == [("https://secondary", ("existing-secondary-id",))]
+
+
+@pytest.mark.asyncio
+async def test_sync_assets_shares_client_for_same_server(monkeypatch: pytest.MonkeyPatch) -> None:
+    created: list[str] = []
+    closed: list[str] = []
+    listed: list[tuple[str, str]] = []
+
+    class FakeClient:
+        def __init__(self, base_url: str, api_key: str) -> None:
+            self.base_url = base_url
+            created.append(base_url)
+
+        async def list_album_assets(self, album_id: str) -> list[dict]:
+            listed.append((self.base_url, album_id))
+            return []
+
+        async def aclose(self) -> None:
+            closed.append(self.base_url)
+
+    monkeypatch.setattr(sync_mod, "ImmichClient", FakeClient)
+
+    config = SyncConfig(
+        servers=(
+            ServerConfig(name="family", base_url="https://primary", api_key="one", album_id="album-a"),
+            ServerConfig(name="archive", base_url="https://primary", api_key="one", album_id="album-b"),
+            ServerConfig(name="backup", base_url="https://secondary", api_key="two", album_id="album-c"),
+            ServerConfig(name="backup-copy", base_url="https://secondary", api_key="two", album_id="album-c"),
+        )
+    )
+
+    await sync_mod.sync_assets(config, progress=False, workers=1)
+
+    assert created == ["https://primary", "https://secondary"]
+    assert sorted(listed) == [
+        ("https://primary", "album-a"),
+        ("https://primary", "album-b"),
+        ("https://secondary", "album-c"),
+    ]
+    assert sorted(closed) == ["https://primary", "https://secondary"]
+
+
+@pytest.mark.asyncio
+async def test_sync_assets_waits_for_listings_before_closing_clients(monkeypatch: pytest.MonkeyPatch) -> None:
+    events: list[str] = []
+
+    class FakeClient:
+        def __init__(self, base_url: str, api_key: str) -> None:
+            self.base_url = base_url
+
+        async def list_album_assets(self, album_id: str) -> list[dict]:
+            if self.base_url == "https://primary":
+                raise RuntimeError("listing failed")
+            await asyncio.sleep(0.01)
+            events.append(f"listed {self.base_url}")
+            return []
+
+        async def aclose(self) -> None:
+            events.append(f"closed {self.base_url}")
+
+    monkeypatch.setattr(sync_mod, "ImmichClient", FakeClient)
+
+    config = SyncConfig(
+        servers=(
+            ServerConfig(name="primary", base_url="https://primary", api_key="one", album_id="album-a"),
+            ServerConfig(name="secondary", base_url="https://secondary", api_key="two", album_id="album-b"),
+        )
+    )
+
+    with pytest.raises(RuntimeError, match="listing failed"):
+        await sync_mod.sync_assets(config, progress=False, workers=1)
+
+    assert events[0] == "listed https://secondary"
+    assert sorted(events[1:]) == ["closed https://primary", "closed https://secondary"]
+
+
+@pytest.mark.asyncio
+async def test_sync_assets_aborts_download_over_size_limit(monkeypatch: pytest.MonkeyPatch) -> None:
+    assets_by_base = {
+        "https://primary": [{"id": "asset-1", "checksum": "chk1", "originalFileName": "video.mp4", "size": None}],
+        "https://secondary": [],
+    }
+    uploads: list[str] = []
+    budgets: list[int | None] = []
+
+    class FakeClient:
+        def __init__(self, base_url: str, api_key: str) -> None:
+            self.base_url = base_url
+
+        async def list_album_assets(self, album_id: str) -> list[dict]:
+            return list(assets_by_base[self.base_url])
+
+        async def stream_asset(self, asset_id: str, sink: IO[bytes], max_bytes: int | None = None) -> int:
+            budgets.append(max_bytes)
+            raise AssetTooLargeError(asset_id, 50)
+
+        async def upload_asset(
+            self, filename: str, content: IO[bytes], metadata: dict, checksum_b64: str | None = None
+        ) -> dict:
+            uploads.append(filename)
+            return {"id": "uploaded"}
+
+        async def add_assets_to_album(self, album_id: str, asset_ids: list[str]) -> list[dict]:
+            return []
+
+        async def check_bulk_upload(self, assets: list[dict]) -> dict:
+            return {"results": []}
+
+        async def aclose(self) -> None:  # pragma: no cover
+            return None
+
+    monkeypatch.setattr(sync_mod, "ImmichClient", FakeClient)
+
+    config = SyncConfig(
+        servers=(
+            ServerConfig(name="primary", base_url="https://primary", api_key="one", album_id="album-a"),
+            ServerConfig(
+                name="secondary",
+                base_url="https://secondary",
+                api_key="two",
+                album_id="album-b",
+                size_limit_bytes=12,
+            ),
+        )
+    )
+
+    summary = await sync_mod.sync_assets(config, progress=False, workers=1)
+
+    assert summary.per_server["secondary"].oversized == 1
+    assert summary.oversized["secondary"][0]["filename"] == "video.mp4"
+    assert uploads == []
+    assert budgets == [12]
+
+
+@pytest.mark.asyncio
+async def test_sync_assets_batches_existing_checks_per_target(monkeypatch: pytest.MonkeyPatch) -> None:
+    assets_by_base = {
+        "https://primary": [
+            {"id": f"asset-{n}", "checksum": f"chk{n}", "originalFileName": f"photo{n}.jpg", "size": 10}
+            for n in range(1, 4)
+        ],
+        "https://secondary": [],
+    }
+    check_calls: list[list[str]] = []
+    album_updates: list[tuple[str, ...]] = []
+
+    class FakeClient:
+        def __init__(self, base_url: str, api_key: str) -> None:
+            self.base_url = base_url
+
+        async def list_album_assets(self, album_id: str) -> list[dict]:
+            return list(assets_by_base[self.base_url])
+
+        async def stream_asset(self, asset_id: str, sink: IO[bytes], max_bytes: int | None = None) -> int:
+            sink.write(b"data")
+            return 4
+
+        async def upload_asset(
+            self, filename: str, content: IO[bytes], metadata: dict, checksum_b64: str | None = None
+        ) -> dict:
+            return {"id": f"uploaded-{checksum_b64}"}
+
+        async def add_assets_to_album(self, album_id: str, asset_ids: list[str]) -> list[dict]:
+            album_updates.append(tuple(asset_ids))
+            return []
+
+        async def check_bulk_upload(self, assets: list[dict]) -> dict:
+            check_calls.append([entry["checksum"] for entry in assets])
+            return {
+                "results": [
+                    {"id": entry["id"], "action": "reject", "reason": "duplicate", "assetId": "existing-2"}
+                    if entry["checksum"] == "chk2"
+                    else {"id": entry["id"], "action": "accept"}
+                    for entry in assets
+                ]
+            }
+
+        async def aclose(self) -> None:  # pragma: no cover
+            return None
+
+    monkeypatch.setattr(sync_mod, "ImmichClient", FakeClient)
+
+    config = SyncConfig(
+        servers=(
+            ServerConfig(name="primary", base_url="https://primary", api_key="one", album_id="album-a"),
+            ServerConfig(name="secondary", base_url="https://secondary", api_key="two", album_id="album-b"),
+        )
+    )
+
+    summary = await sync_mod.sync_assets(config, progress=False, workers=2)
+
+    assert check_calls == [["chk1", "chk2", "chk3"]]
+    assert summary.linked == 1
+    assert summary.copied == 2
+    assert sorted(album_updates) == [("existing-2",), ("uploaded-chk1",), ("uploaded-chk3",)]
+
+
+@pytest.mark.asyncio
+async def test_sync_assets_links_upload_for_sibling_album_on_same_server(monkeypatch: pytest.MonkeyPatch) -> None:
+    assets_by_album = {
+        "album-a": [{"id": "asset-1", "checksum": "chk1", "originalFileName": "photo.jpg", "size": 10}],
+        "album-b": [],
+        "album-c": [],
+    }
+    check_calls: list[list[str]] = []
+    downloads: list[str] = []
+    uploads: list[str] = []
+    album_updates: list[tuple[str, tuple[str, ...]]] = []
+
+    class FakeClient:
+        def __init__(self, base_url: str, api_key: str) -> None:
+            self.base_url = base_url
+
+        async def list_album_assets(self, album_id: str) -> list[dict]:
+            return list(assets_by_album[album_id])
+
+        async def stream_asset(self, asset_id: str, sink: IO[bytes], max_bytes: int | None = None) -> int:
+            downloads.append(asset_id)
+            sink.write(b"data")
+            return 4
+
+        async def upload_asset(
+            self, filename: str, content: IO[bytes], metadata: dict, checksum_b64: str | None = None
+        ) -> dict:
+            uploads.append(filename)
+            return {"id": "uploaded-1"}
+
+        async def add_assets_to_album(self, album_id: str, asset_ids: list[str]) -> list[dict]:
+            album_updates.append((album_id, tuple(asset_ids)))
+            return []
+
+        async def check_bulk_upload(self, assets: list[dict]) -> dict:
+            check_calls.append([entry["checksum"] for entry in assets])
+            return {"results": [{"id": entry["id"], "action": "accept"} for entry in assets]}
+
+        async def aclose(self) -> None:  # pragma: no cover
+            return None
+
+    monkeypatch.setattr(sync_mod, "ImmichClient", FakeClient)
+
+    config = SyncConfig(
+        servers=(
+            ServerConfig(name="source", base_url="https://source", api_key="one", album_id="album-a"),
+            ServerConfig(name="shared-b", base_url="https://shared", api_key="two", album_id="album-b"),
+            ServerConfig(name="shared-c", base_url="https://shared", api_key="two", album_id="album-c"),
+        )
+    )
+
+    summary = await sync_mod.sync_assets(config, progress=False, workers=2)
+
+    assert check_calls == [["chk1"]]
+    assert downloads == ["asset-1"]
+    assert uploads == ["photo.jpg"]
+    assert summary.copied == 1
+    assert summary.linked == 1
+    assert sorted(album_updates) == [("album-b", ("uploaded-1",)), ("album-c", ("uploaded-1",))]
+
+
+@pytest.mark.asyncio
+async def test_sync_assets_falls_back_when_bulk_check_is_not_an_object(monkeypatch: pytest.MonkeyPatch) -> None:
+    assets_by_base = {
+        "https://primary": [{"id": "asset-1", "checksum": "chk1", "originalFileName": "photo.jpg", "size": 10}],
+        "https://secondary": [],
+    }
+    check_ids: list[str] = []
+
+    class FakeClient:
+        def __init__(self, base_url: str, api_key: str) -> None:
+            self.base_url = base_url
+
+        async def list_album_assets(self, album_id: str) -> list[dict]:
+            return list(assets_by_base[self.base_url])
+
+        async def stream_asset(self, asset_id: str, sink: IO[bytes], max_bytes: int | None = None) -> int:
+            sink.write(b"data")
+            return 4
+
+        async def upload_asset(
+            self, filename: str, content: IO[bytes], metadata: dict, checksum_b64: str | None = None
+        ) -> dict:
+            return {"id": "uploaded-1"}
+
+        async def add_assets_to_album(self, album_id: str, asset_ids: list[str]) -> list[dict]:
+            return []
+
+        async def check_bulk_upload(self, assets: list[dict]) -> dict | list:
+            check_ids.append(assets[0]["id"])
+            if len(check_ids) == 1:
+                return []
+            return {"results": []}
+
+        async def aclose(self) -> None:  # pragma: no cover
+            return None
+
+    monkeypatch.setattr(sync_mod, "ImmichClient", FakeClient)
+
+    config = SyncConfig(
+        servers=(
+            ServerConfig(name="primary", base_url="https://primary", api_key="one", album_id="album-a"),
+            ServerConfig(name="secondary", base_url="https://secondary", api_key="two", album_id="album-b"),
+        )
+    )
+
+    summary = await sync_mod.sync_assets(config, progress=False, workers=1)
+
+    assert len(check_ids) == 2
+    assert summary.copied == 1
+    assert summary.errors == []
+
+
+@pytest.mark.asyncio
+async def test_batched_progress_coalesces_updates() -> None:
+    updates: list[int] = []
+
+    class FakeBar:
+        def update(self, n: int) -> None:
+            updates.append(n)
+
+    ticker = sync_mod._BatchedProgress(FakeBar(), interval=0.01)  # type: ignore[arg-type]
+    task = asyncio.create_task(ticker.run())
+    for _ in range(3):
+        ticker.advance()
+    await asyncio.sleep(0.05)
+    ticker.advance()
+    task.cancel()
+    with contextlib.suppress(asyncio.CancelledError):
+        await task
+    ticker.flush()
+
+    assert updates == [3, 1]
+
+
+def test_open_spool_keeps_small_assets_in_memory() -> None:
+    small = sync_mod._open_spool(1024)
+    large = sync_mod._open_spool(sync_mod.SPOOL_TO_DISK_THRESHOLD + 1)
+    unsized = sync_mod._open_spool(None)
+    try:
+        assert isinstance(small, io.BytesIO)
+        assert not isinstance(large, io.BytesIO)
+        assert not isinstance(unsized, io.BytesIO)
+    finally:
+        for spool in (small, large, unsized):
+            spool.close()